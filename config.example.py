@@ -18,3 +18,68 @@ CHECK_INTERVAL = 15
 
 # Interface language: "ru" or "en"
 LANGUAGE = "ru"
+
+# Durable Telegram outbox: queued messages survive restarts and are retried per recipient.
+# Keep it in data/ (mounted by docker-compose.yml), otherwise it is lost when the container is recreated
+OUTBOX_FILE = "data/outbox.json"
+OUTBOX_MAX_ATTEMPTS = 8
+
+# Keep raw bodies of the last N emails in memory for debugging (0 = disabled).
+# When enabled, the body of an email nothing could be extracted from is written to the log
+RAW_BODY_CACHE_SIZE = 0
+
+# Circuit breaker: pause calls to a failing service after N consecutive errors
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 60  # seconds before a probe request is allowed
+
+# JSON file with circuit breaker states for healthchecks/metrics, e.g. "data/health.json"
+# (None = disabled)
+HEALTH_FILE = None
+
+# Gmail API quota budget in units per minute for this mailbox
+# (Gmail's per-user limit is 15,000). Polling slows down automatically to stay under it.
+GMAIL_QUOTA_BUDGET = 6000
+
+# HTTP transport: persistent keep-alive connection pool per client
+HTTP_POOL_SIZE = 4
+HTTP_TIMEOUT = 30  # seconds
+TELEGRAM_HTTP2 = False  # requires: pip install "httpx[http2]"
+
+# How many recent codes/links to keep in memory for the /last command
+RECENT_CODES_SIZE = 10
+
+# Reload ALLOWED_USER_IDS, GMAIL_QUERY, CHECK_INTERVAL, LANGUAGE, ROUTING_RULES and
+# USER_LANGUAGES when this file changes
+CONFIG_RELOAD = True
+
+# Per-recipient routing. Empty = every allowed user receives every notification.
+# Each rule sends matching emails to "users"; optional filters (missing = any):
+#   "types": link, mobile_link, code, payment_failed, unknown
+#   "senders": addresses or domains, e.g. "anthropic.com"
+#   "mailboxes": values of MAILBOX_NAME
+# Emails no rule matches go to every allowed user (with a warning in the log).
+ROUTING_RULES: list[dict] = [
+    # {"users": [123456789], "types": ["link", "mobile_link", "code"]},
+    # {"users": [987654321], "types": ["payment_failed"], "senders": ["anthropic.com"]},
+]
+
+# Per-user notification language, e.g. {123456789: "en"} (others use LANGUAGE)
+USER_LANGUAGES: dict[int, str] = {}
+
+# Name of this Gmail mailbox in ROUTING_RULES
+MAILBOX_NAME = "default"
+
+# Seconds from SIGTERM/SIGINT until the bot has finished the running poll, deliveries and
+# Gmail acks and saved the outbox (keep below the `docker stop` timeout; a second signal force-quits)
+SHUTDOWN_TIMEOUT = 8
+
+# Per-stage tracing (fetch, parse, route, send, ack) for finding slow stages
+TRACING_ENABLED = False
+# Append spans as JSON lines
+TRACE_FILE = None
+# OTLP/HTTP collector, e.g. "http://localhost:4318" (Jaeger, Tempo, OpenTelemetry Collector)
+TRACE_OTLP_ENDPOINT = None
+# Log a warning for any stage slower than this many milliseconds (works without tracing)
+SLOW_STAGE_MS = None
+# Where `kill -USR2` writes profiles (collapsed stacks for flamegraph.pl / speedscope)
+PROFILE_DIR = "."
@@ -0,0 +1,159 @@
+"""Hot reload of config.py without restarting the bot.
+
+The file is checked with a cheap mtime comparison. A changed file is loaded
+into a separate module, validated, and only then are the reloadable settings
+swapped into the live `config` module in one step. Messages already queued in
+the outbox were rendered with the old settings and are delivered unchanged.
+"""
+
+import importlib.util
+import logging
+import os
+from types import ModuleType, SimpleNamespace
+from typing import Any
+
+import config
+from i18n import SUPPORTED_LANGUAGES, set_language, t
+from routing import routing_errors
+
+logger = logging.getLogger(__name__)
+
+# Settings that take effect without a restart
+RELOADABLE_KEYS = (
+    "ALLOWED_USER_IDS",
+    "GMAIL_QUERY",
+    "CHECK_INTERVAL",
+    "LANGUAGE",
+    "ROUTING_RULES",
+    "USER_LANGUAGES",
+)
+
+# Values of optional reloadable settings when they are removed from config.py
+RELOAD_DEFAULTS: dict[str, Any] = {
+    "LANGUAGE": "ru",
+    "ROUTING_RULES": [],
+    "USER_LANGUAGES": {},
+}
+
+
+def config_errors(cfg: Any) -> list[str]:
+    """Validate a config module.
+
+    Returns:
+        list[str]: Error messages (empty if the config is valid)
+    """
+    errors: list[str] = []
+
+    if not getattr(cfg, "TELEGRAM_BOT_TOKEN", None):
+        errors.append(t("config_error_token"))
+
+    user_ids = getattr(cfg, "ALLOWED_USER_IDS", None)
+    if not user_ids:
+        errors.append(t("config_error_users"))
+    elif not all(isinstance(user_id, int) for user_id in user_ids):
+        errors.append(t("config_error_user_ids_type"))
+
+    if not getattr(cfg, "GMAIL_CREDENTIALS_FILE", None):
+        errors.append(t("config_error_gmail"))
+
+    if not getattr(cfg, "GMAIL_QUERY", None):
+        errors.append(t("config_error_query"))
+
+    interval = getattr(cfg, "CHECK_INTERVAL", None)
+    if not isinstance(interval, int | float) or interval <= 0:
+        errors.append(t("config_error_interval"))
+
+    budget = getattr(cfg, "GMAIL_QUOTA_BUDGET", 6000)
+    if not isinstance(budget, int | float) or budget <= 0:
+        errors.append(t("config_error_quota_budget"))
+
+    language = getattr(cfg, "LANGUAGE", "ru")
+    if language not in SUPPORTED_LANGUAGES:
+        errors.append(t("config_error_language", language=language))
+
+    errors.extend(routing_errors(cfg))
+    return errors
+
+
+class ConfigWatcher:
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path or config.__file__
+        self._mtime = self._get_mtime()
+
+    def _get_mtime(self) -> int | None:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> ModuleType:
+        """Load the config file into a new module object (the live config is untouched)."""
+        spec = importlib.util.spec_from_file_location("_config_reload", self.path)
+        if spec is None or spec.loader is None:
+            raise ImportError(self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def check(self) -> bool:
+        """Reload the config if the file has changed.
+
+        Returns:
+            bool: True if new settings were applied
+        """
+        mtime = self._get_mtime()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        try:
+            new_config = self._load()
+        except Exception as e:
+            logger.error(t("config_reload_error", error=e))
+            return False
+
+        # A removed optional key falls back to its default instead of keeping the old value
+        reloaded: dict[str, Any] = {
+            key: getattr(new_config, key, RELOAD_DEFAULTS.get(key))
+            for key in RELOADABLE_KEYS
+            if hasattr(new_config, key) or key in RELOAD_DEFAULTS
+        }
+        # The settings that will actually be live: current ones plus the reloaded ones
+        current = {key: getattr(config, key) for key in dir(config) if key.isupper()}
+        live = SimpleNamespace(**(current | reloaded))
+
+        errors = config_errors(new_config)
+        errors += [err for err in routing_errors(live) if err not in errors]
+        if errors:
+            logger.error(t("config_reload_rejected"))
+            for err in errors:
+                logger.error(f"  - {err}")
+            return False
+
+        restart_keys = [
+            key
+            for key in dir(new_config)
+            if key.isupper()
+            and key not in RELOADABLE_KEYS
+            and getattr(new_config, key) != getattr(config, key, None)
+        ]
+        if restart_keys:
+            logger.warning(t("config_restart_required", keys=", ".join(restart_keys)))
+
+        changed = {
+            key: value
+            for key, value in reloaded.items()
+            if value != getattr(config, key, RELOAD_DEFAULTS.get(key))
+        }
+        if not changed:
+            return False
+
+        # Swap everything at once; no await in between, so other tasks see either
+        # the old or the new settings, never a mix
+        for key, value in changed.items():
+            setattr(config, key, value)
+        if "LANGUAGE" in changed:
+            set_language(changed["LANGUAGE"])
+
+        logger.info(t("config_reloaded", keys=", ".join(changed)))
+        return True
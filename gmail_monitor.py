@@ -5,6 +5,8 @@ import logging
 import os
 import re
 import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Any
 from urllib.parse import parse_qs, urlparse
 
@@ -16,6 +18,10 @@ from googleapiclient.discovery import build
 
 import config
 from i18n import t
+from quota import QuotaLedger
+from retry import ErrorClass, classify_error
+from tracing import tracer
+from transport import GmailHttpPool
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +50,9 @@ def _can_open_browser() -> bool:
 class GmailAPIError(Exception):
     """Error when working with Gmail API."""
 
-    pass
+    def __init__(self, message: str, error_class: ErrorClass = ErrorClass.TRANSIENT) -> None:
+        super().__init__(message)
+        self.error_class = error_class
 
 
 class TokenExpiredError(Exception):
@@ -53,10 +61,43 @@ class TokenExpiredError(Exception):
     pass
 
 
+@dataclass(slots=True)
+class EmailRecord:
+    """Processed email: headers and extraction result, without the raw body."""
+
+    id: str
+    subject: str
+    sender: str
+    internal_date: int
+    auth_data: dict[str, str] | None = None
+    payment_data: dict[str, str] | None = None
+    mailbox: str = "default"
+
+    @property
+    def kind(self) -> str:
+        """Extraction type: link, mobile_link, code, payment_failed or unknown."""
+        if self.auth_data:
+            return self.auth_data["type"]
+        if self.payment_data:
+            return self.payment_data["type"]
+        return "unknown"
+
+
 class GmailMonitor:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        raw_body_cache_size: int = 0,
+        http_pool: GmailHttpPool | None = None,
+        mailbox: str = "default",
+    ) -> None:
+        self.mailbox = mailbox
         self.service: Any = None
         self.creds: Credentials | None = None
+        self.http_pool = http_pool or GmailHttpPool()
+        # Optional LRU of raw bodies for debugging (disabled when size is 0)
+        self.raw_body_cache_size = raw_body_cache_size
+        self._raw_bodies: OrderedDict[str, str] = OrderedDict()
+        self.quota = QuotaLedger()
 
     def authenticate(self) -> None:
         """Authenticate with Gmail API."""
@@ -98,9 +139,18 @@ class GmailMonitor:
             with open(config.GMAIL_TOKEN_FILE, "w") as token:
                 token.write(self.creds.to_json())
 
-        self.service = build("gmail", "v1", credentials=self.creds, cache_discovery=False)
+        self._build_service()
         logger.info(t("gmail_auth_success"))
 
+    def _build_service(self) -> None:
+        """Build the API client on top of the shared connection pool."""
+        http = self.http_pool.bind(self.creds)
+        self.service = build("gmail", "v1", http=http, cache_discovery=False)
+
+    def close(self) -> None:
+        """Close persistent connections."""
+        self.http_pool.close()
+
     def _run_manual_auth_flow(self, flow: InstalledAppFlow, port: int) -> Credentials:
         """Run OAuth flow via web page for headless environments (Docker/SSH/VPS).
 
@@ -204,12 +254,7 @@ class GmailMonitor:
 
     def _is_token_error(self, error: Exception) -> bool:
         """Check if error is related to expired/revoked token."""
-        error_str = str(error).lower()
-        return (
-            "invalid_grant" in error_str
-            or "token" in error_str
-            and ("expired" in error_str or "revoked" in error_str)
-        )
+        return classify_error(error) is ErrorClass.AUTH
 
     def _reauth_if_token_error(self, error: Exception) -> bool:
         """Try to refresh token if error is token-related. Returns True if refresh succeeded.
@@ -222,9 +267,7 @@ class GmailMonitor:
             if self.creds and self.creds.refresh_token:
                 try:
                     self.creds.refresh(Request())
-                    self.service = build(
-                        "gmail", "v1", credentials=self.creds, cache_discovery=False
-                    )
+                    self._build_service()
                     with open(config.GMAIL_TOKEN_FILE, "w") as f:
                         f.write(self.creds.to_json())
                     logger.info(t("gmail_auth_success"))
@@ -237,9 +280,20 @@ class GmailMonitor:
             raise TokenExpiredError(t("token_fully_expired"))
         return False
 
-    def get_unread_claude_emails(self, _retry: bool = True) -> list[dict[str, Any]]:
+    def _execute(self, request: Any, method: str) -> Any:
+        """Execute an API request on a pooled connection, recording its quota cost."""
+        self.quota.record(method)
+        with self.http_pool.connection() as http:
+            return request.execute(http=http)
+
+    def get_unread_claude_emails(
+        self, max_results: int = 10, _retry: bool = True
+    ) -> list[EmailRecord]:
         """Get unread emails from Claude/Anthropic.
 
+        Args:
+            max_results: Max emails to fetch in this call
+
         Returns:
             list: List of emails (empty if no new ones)
 
@@ -247,12 +301,13 @@ class GmailMonitor:
             GmailAPIError: On API error
         """
         try:
-            results = (
-                self.service.users()
-                .messages()
-                .list(userId="me", q=config.GMAIL_QUERY, maxResults=10)
-                .execute()
-            )
+            with tracer.span("gmail.list", max_results=max_results):
+                results = self._execute(
+                    self.service.users()
+                    .messages()
+                    .list(userId="me", q=config.GMAIL_QUERY, maxResults=max_results),
+                    "messages.list",
+                )
 
             messages = results.get("messages", [])
             emails = []
@@ -266,40 +321,70 @@ class GmailMonitor:
         except Exception as e:
             # If token expired during API call, re-auth and retry once
             if _retry and self._reauth_if_token_error(e):
-                return self.get_unread_claude_emails(_retry=False)
-            raise GmailAPIError(t("gmail_fetch_error", error=e)) from e
-
-    def _get_email_content(self, msg_id: str) -> dict[str, Any] | None:
-        """Get email content."""
-        try:
-            message = (
-                self.service.users().messages().get(userId="me", id=msg_id, format="full").execute()
-            )
+                return self.get_unread_claude_emails(max_results, _retry=False)
+            raise GmailAPIError(t("gmail_fetch_error", error=e), classify_error(e)) from e
 
-            headers = message["payload"]["headers"]
-            subject = self._get_header(headers, "subject", t("no_subject"))
-            sender = self._get_header(headers, "from", t("unknown_sender"))
+    def _get_email_content(self, msg_id: str) -> EmailRecord | None:
+        """Get email content and extract auth/payment data.
 
-            body = self._extract_body(message["payload"])
-            auth_data = self._extract_auth_data(body)
-            payment_data = None
-
-            subject_lower = subject.lower()
-            if not auth_data and ("payment" in subject_lower or "unsuccessful" in subject_lower):
-                payment_data = self._extract_payment_data(body, subject)
+        The decoded body is dropped right after extraction (see get_raw_body()).
+        """
+        try:
+            with tracer.span("email.fetch", msg_id):
+                with tracer.span("gmail.get"):
+                    message = self._execute(
+                        self.service.users().messages().get(userId="me", id=msg_id, format="full"),
+                        "messages.get",
+                    )
 
-            return {
-                "id": msg_id,
-                "subject": subject,
-                "from": sender,
-                "body": body,
-                "auth_data": auth_data,
-                "payment_data": payment_data,
-            }
+                headers = message["payload"]["headers"]
+                subject = self._get_header(headers, "subject", t("no_subject"))
+                sender = self._get_header(headers, "from", t("unknown_sender"))
+                internal_date = int(message.get("internalDate", 0))
+
+                with tracer.span("extract.body"):
+                    body = self._extract_body(message["payload"])
+                del message
+                with tracer.span("extract.auth"):
+                    auth_data = self._extract_auth_data(body)
+                payment_data = None
+
+                subject_lower = subject.lower()
+                if not auth_data and (
+                    "payment" in subject_lower or "unsuccessful" in subject_lower
+                ):
+                    with tracer.span("extract.payment"):
+                        payment_data = self._extract_payment_data(body, subject)
+
+                self._remember_raw_body(msg_id, body)
+                del body
+
+                return EmailRecord(
+                    id=msg_id,
+                    subject=subject,
+                    sender=sender,
+                    internal_date=internal_date,
+                    auth_data=auth_data,
+                    payment_data=payment_data,
+                    mailbox=self.mailbox,
+                )
         except Exception as e:
             logger.error(t("email_read_error", msg_id=msg_id, error=e))
             return None
 
+    def _remember_raw_body(self, msg_id: str, body: str) -> None:
+        """Keep the raw body in the bounded debug cache (if enabled)."""
+        if self.raw_body_cache_size <= 0:
+            return
+        self._raw_bodies[msg_id] = body
+        self._raw_bodies.move_to_end(msg_id)
+        while len(self._raw_bodies) > self.raw_body_cache_size:
+            self._raw_bodies.popitem(last=False)
+
+    def get_raw_body(self, msg_id: str) -> str | None:
+        """Get a cached raw body for debugging (None if not cached or cache disabled)."""
+        return self._raw_bodies.get(msg_id)
+
     def _get_header(self, headers: list[dict], name: str, default: str = "") -> str:
         """Extract header value by name."""
         return next((h["value"] for h in headers if h["name"].lower() == name.lower()), default)
@@ -330,16 +415,17 @@ class GmailMonitor:
 
     def _strip_html(self, html: str) -> str:
         """Strip HTML tags and decode entities to get plain text."""
-        text = re.sub(r"<style[^>]*>.*?</style>", "", html, flags=re.DOTALL)
-        text = re.sub(r"<!--.*?-->", "", text, flags=re.DOTALL)
-        text = re.sub(r"<br\s*/?>", "\n", text)
-        text = re.sub(r"</?(p|div|tr|td|table|h[1-6])[^>]*>", "\n", text)
-        text = re.sub(r"<[^>]+>", "", text)
-        text = re.sub(r"&nbsp;", " ", text)
-        text = re.sub(r"&amp;", "&", text)
-        text = re.sub(r"&#\d+;", "", text)
-        text = re.sub(r"\n{3,}", "\n\n", text)
-        return text.strip()
+        with tracer.span("strip_html", size=len(html)):
+            text = re.sub(r"<style[^>]*>.*?</style>", "", html, flags=re.DOTALL)
+            text = re.sub(r"<!--.*?-->", "", text, flags=re.DOTALL)
+            text = re.sub(r"<br\s*/?>", "\n", text)
+            text = re.sub(r"</?(p|div|tr|td|table|h[1-6])[^>]*>", "\n", text)
+            text = re.sub(r"<[^>]+>", "", text)
+            text = re.sub(r"&nbsp;", " ", text)
+            text = re.sub(r"&amp;", "&", text)
+            text = re.sub(r"&#\d+;", "", text)
+            text = re.sub(r"\n{3,}", "\n\n", text)
+            return text.strip()
 
     def _extract_auth_data(self, body: str) -> dict[str, str] | None:
         """Extract auth link or code from email body."""
@@ -383,15 +469,25 @@ class GmailMonitor:
             }
         return None
 
-    def mark_as_read(self, msg_id: str, _retry: bool = True) -> None:
-        """Mark email as read."""
+    def mark_as_read(self, msg_id: str, _retry: bool = True) -> ErrorClass | None:
+        """Mark email as read.
+
+        Returns:
+            ErrorClass | None: None if the email was marked as read, otherwise the error class
+        """
         try:
-            self.service.users().messages().modify(
-                userId="me", id=msg_id, body={"removeLabelIds": ["UNREAD"]}
-            ).execute()
+            with tracer.span("gmail.modify", msg_id):
+                self._execute(
+                    self.service.users()
+                    .messages()
+                    .modify(userId="me", id=msg_id, body={"removeLabelIds": ["UNREAD"]}),
+                    "messages.modify",
+                )
             logger.info(t("email_marked_read", msg_id=msg_id))
+            return None
         except Exception as e:
             # If token expired during API call, re-auth and retry once
             if _retry and self._reauth_if_token_error(e):
                 return self.mark_as_read(msg_id, _retry=False)
             logger.error(t("email_mark_error", error=e))
+            return classify_error(e)
@@ -1,8 +1,14 @@
 """Internationalization module for the bot.
 
-Supports English (en) and Russian (ru) languages.
+Supports English (en) and Russian (ru) languages. Messages are compiled once
+per language into a flat table, with layouts already inlined.
 """
 
+import ast
+import glob
+import os
+import re
+import string
 from typing import Any
 
 # All messages in both languages
@@ -20,6 +26,46 @@ MESSAGES: dict[str, dict[str, str]] = {
         "en": "GMAIL_CREDENTIALS_FILE is not set",
         "ru": "GMAIL_CREDENTIALS_FILE не задан",
     },
+    "config_error_user_ids_type": {
+        "en": "ALLOWED_USER_IDS must contain numeric Telegram user IDs",
+        "ru": "ALLOWED_USER_IDS должен содержать числовые ID пользователей Telegram",
+    },
+    "config_error_query": {
+        "en": "GMAIL_QUERY is empty or not set",
+        "ru": "GMAIL_QUERY пустой или не задан",
+    },
+    "config_error_interval": {
+        "en": "CHECK_INTERVAL must be a positive number",
+        "ru": "CHECK_INTERVAL должен быть положительным числом",
+    },
+    "config_error_quota_budget": {
+        "en": "GMAIL_QUOTA_BUDGET must be a positive number",
+        "ru": "GMAIL_QUOTA_BUDGET должен быть положительным числом",
+    },
+    "config_error_language": {
+        "en": "Unsupported LANGUAGE: {language}",
+        "ru": "Неподдерживаемый LANGUAGE: {language}",
+    },
+    "routing_error_users": {
+        "en": 'ROUTING_RULES rule {rule}: "users" is empty or not set',
+        "ru": 'ROUTING_RULES правило {rule}: "users" пустой или не задан',
+    },
+    "routing_error_not_allowed": {
+        "en": "ROUTING_RULES rule {rule}: users not in ALLOWED_USER_IDS: {users}",
+        "ru": "ROUTING_RULES правило {rule}: пользователи не из ALLOWED_USER_IDS: {users}",
+    },
+    "routing_error_types": {
+        "en": "ROUTING_RULES rule {rule}: unknown types: {types}",
+        "ru": "ROUTING_RULES правило {rule}: неизвестные типы: {types}",
+    },
+    "routing_error_language": {
+        "en": "USER_LANGUAGES: unsupported language {language} for user {user_id}",
+        "ru": "USER_LANGUAGES: неподдерживаемый язык {language} для пользователя {user_id}",
+    },
+    "routing_no_match": {
+        "en": "No ROUTING_RULES rule matches {kind} email from {sender} (mailbox {mailbox}), sending it to all ALLOWED_USER_IDS",
+        "ru": "Ни одно правило ROUTING_RULES не подходит для письма {kind} от {sender} (ящик {mailbox}), отправляю всем ALLOWED_USER_IDS",
+    },
     "config_errors_header": {
         "en": "Configuration errors:",
         "ru": "Ошибки конфигурации:",
@@ -28,6 +74,22 @@ MESSAGES: dict[str, dict[str, str]] = {
         "en": "Configuration verified ✓",
         "ru": "Конфигурация проверена ✓",
     },
+    "config_reloaded": {
+        "en": "Configuration reloaded: {keys}",
+        "ru": "Конфигурация перезагружена: {keys}",
+    },
+    "config_reload_error": {
+        "en": "Could not load changed config.py, keeping current settings: {error}",
+        "ru": "Не удалось загрузить изменённый config.py, текущие настройки сохранены: {error}",
+    },
+    "config_reload_rejected": {
+        "en": "Changed config.py is invalid, keeping current settings:",
+        "ru": "Изменённый config.py содержит ошибки, текущие настройки сохранены:",
+    },
+    "config_restart_required": {
+        "en": "These settings take effect only after a restart: {keys}",
+        "ru": "Эти настройки вступят в силу только после перезапуска: {keys}",
+    },
     "gmail_auth_start": {
         "en": "Authenticating with Gmail...",
         "ru": "Авторизация в Gmail...",
@@ -44,9 +106,13 @@ MESSAGES: dict[str, dict[str, str]] = {
         "en": "Found {count} new email(s)",
         "ru": "Найдено {count} новых писем",
     },
-    "telegram_not_sent": {
-        "en": "Telegram not sent, email NOT marked as read",
-        "ru": "Telegram не отправлен, письмо НЕ помечено прочитанным",
+    "email_queued": {
+        "en": "Email {msg_id} queued for {count} recipient(s)",
+        "ru": "Письмо {msg_id} поставлено в очередь для {count} получателей",
+    },
+    "unparsed_email_body": {
+        "en": "Could not extract anything from email {msg_id}, raw body:\n{body}",
+        "ru": "Из письма {msg_id} ничего не извлечено, исходный текст:\n{body}",
     },
     "no_new_emails": {
         "en": "No new emails",
@@ -56,9 +122,25 @@ MESSAGES: dict[str, dict[str, str]] = {
         "en": "Gmail API error: {error}",
         "ru": "Gmail API ошибка: {error}",
     },
-    "retry_in_30": {
-        "en": "Retrying in 30 sec...",
-        "ru": "Повтор через 30 сек...",
+    "retry_in": {
+        "en": "Retrying in {delay:.0f} sec...",
+        "ru": "Повтор через {delay:.0f} сек...",
+    },
+    "quota_status": {
+        "en": "Gmail quota: {used}/{budget} units per minute, next poll in {interval:.1f} sec",
+        "ru": "Квота Gmail: {used}/{budget} единиц в минуту, следующая проверка через {interval:.1f} сек",
+    },
+    "quota_wait": {
+        "en": "Gmail quota budget used up, polling in {delay:.0f} sec",
+        "ru": "Бюджет квоты Gmail исчерпан, проверка через {delay:.0f} сек",
+    },
+    "gmail_breaker_open": {
+        "en": "Gmail is unavailable, next attempt in {delay:.0f} sec",
+        "ru": "Gmail недоступен, следующая попытка через {delay:.0f} сек",
+    },
+    "health_write_error": {
+        "en": "Could not write health file {path}: {error}",
+        "ru": "Не удалось записать файл состояния {path}: {error}",
     },
     "unexpected_error": {
         "en": "Unexpected error: {error}",
@@ -68,6 +150,22 @@ MESSAGES: dict[str, dict[str, str]] = {
         "en": "Bot stopped",
         "ru": "Бот остановлен",
     },
+    "ack_dropped": {
+        "en": "Email {msg_id} cannot be marked as read, giving up on it",
+        "ru": "Письмо {msg_id} невозможно пометить прочитанным, больше не пытаюсь",
+    },
+    "shutdown_requested": {
+        "en": "Received {signal}, finishing in-flight work...",
+        "ru": "Получен {signal}, завершаю текущую работу...",
+    },
+    "shutdown_ack_error": {
+        "en": "Could not flush pending acks on shutdown: {error}",
+        "ru": "Не удалось пометить письма прочитанными при остановке: {error}",
+    },
+    "shutdown_complete": {
+        "en": "Shutdown complete: {undelivered} undelivered message(s), {pending_acks} pending ack(s) saved",
+        "ru": "Остановка завершена: сохранено недоставленных сообщений: {undelivered}, непомеченных писем: {pending_acks}",
+    },
     # ===== telegram_bot.py =====
     "msg_sent_to_user": {
         "en": "Message sent to user {user_id}",
@@ -77,6 +175,14 @@ MESSAGES: dict[str, dict[str, str]] = {
         "en": "Error sending to user {user_id}: {error}",
         "ru": "Ошибка отправки пользователю {user_id}: {error}",
     },
+    "msg_retry": {
+        "en": "Error sending to user {user_id}, retry in {delay:.0f} sec: {error}",
+        "ru": "Ошибка отправки пользователю {user_id}, повтор через {delay:.0f} сек: {error}",
+    },
+    "msg_dropped": {
+        "en": "Giving up on message to user {user_id} after {attempts} attempt(s): {error}",
+        "ru": "Сообщение пользователю {user_id} не доставлено после {attempts} попыток: {error}",
+    },
     "auth_link_header": {
         "en": "🔐 Claude login link",
         "ru": "🔐 Ссылка для входа в Claude",
@@ -141,6 +247,121 @@ MESSAGES: dict[str, dict[str, str]] = {
         "en": "Waiting for Claude/Anthropic emails...",
         "ru": "Жду писем от Claude/Anthropic...",
     },
+    # ===== Telegram commands =====
+    "commands_poll_error": {
+        "en": "Error receiving commands, retry in {delay:.0f} sec: {error}",
+        "ru": "Ошибка получения команд, повтор через {delay:.0f} сек: {error}",
+    },
+    "command_denied": {
+        "en": "Ignoring command from unknown user {user_id}",
+        "ru": "Команда от неизвестного пользователя {user_id} проигнорирована",
+    },
+    "command_not_private": {
+        "en": "Ignoring command from user {user_id} outside a private chat",
+        "ru": "Команда от пользователя {user_id} не из личного чата проигнорирована",
+    },
+    "command_error": {
+        "en": "Failed to handle command from user {user_id}: {error}",
+        "ru": "Ошибка обработки команды от пользователя {user_id}: {error}",
+    },
+    "cmd_last_empty": {
+        "en": "No codes received since the bot started.",
+        "ru": "С момента запуска бота кодов не было.",
+    },
+    "cmd_status": {
+        "en": (
+            "📊 Status\n\n"
+            "Last poll: {last_poll}\n"
+            "Gmail token valid until: {token_expiry}\n"
+            "Outbox: {outbox} message(s), {pending_acks} pending ack(s)\n"
+            "Recent codes in memory: {recent}\n"
+            "Gmail quota: {quota_used}/{quota_budget} units/min, poll every {interval} sec\n"
+            "Gmail: {gmail}, Telegram: {telegram}"
+        ),
+        "ru": (
+            "📊 Статус\n\n"
+            "Последняя проверка: {last_poll}\n"
+            "Токен Gmail действует до: {token_expiry}\n"
+            "Очередь: {outbox} сообщений, {pending_acks} ожидают пометки прочитанными\n"
+            "Последних кодов в памяти: {recent}\n"
+            "Квота Gmail: {quota_used}/{quota_budget} единиц/мин, проверка каждые {interval} сек\n"
+            "Gmail: {gmail}, Telegram: {telegram}"
+        ),
+    },
+    "cmd_poll": {
+        "en": "🔄 Checking email now...",
+        "ru": "🔄 Проверяю почту...",
+    },
+    "cmd_help": {
+        "en": (
+            "Commands:\n"
+            "/last [n] - last received code(s)\n"
+            "/status - bot status\n"
+            "/poll - check email now"
+        ),
+        "ru": (
+            "Команды:\n"
+            "/last [n] - последние полученные коды\n"
+            "/status - состояние бота\n"
+            "/poll - проверить почту сейчас"
+        ),
+    },
+    "status_never": {
+        "en": "never",
+        "ru": "ещё не было",
+    },
+    # ===== outbox.py =====
+    "outbox_restored": {
+        "en": "Outbox: restored {count} undelivered message(s)",
+        "ru": "Очередь: восстановлено недоставленных сообщений: {count}",
+    },
+    "outbox_save_error": {
+        "en": "Could not write outbox file {path}, emails stay unread in Gmail: {error}",
+        "ru": "Не удалось записать файл очереди {path}, письма остаются непрочитанными в Gmail: {error}",
+    },
+    "outbox_load_error": {
+        "en": "Could not read outbox file {path}, moved it to {backup}: {error}",
+        "ru": "Не удалось прочитать файл очереди {path}, он перемещён в {backup}: {error}",
+    },
+    # ===== retry.py =====
+    "breaker_opened": {
+        "en": "Circuit breaker '{name}' opened after {failures} failure(s), probing again in {delay:.0f} sec",
+        "ru": "Автомат '{name}' разомкнут после {failures} ошибок, проверка через {delay:.0f} сек",
+    },
+    "breaker_closed": {
+        "en": "Circuit breaker '{name}' closed, service recovered",
+        "ru": "Автомат '{name}' замкнут, сервис восстановлен",
+    },
+    # ===== transport.py =====
+    "http2_unavailable": {
+        "en": "TELEGRAM_HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1",
+        "ru": "TELEGRAM_HTTP2 включён, но пакет h2 не установлен, используется HTTP/1.1",
+    },
+    # ===== tracing.py =====
+    "slow_stage": {
+        "en": "Slow stage {name}: {duration:.0f} ms {attrs}",
+        "ru": "Медленный этап {name}: {duration:.0f} мс {attrs}",
+    },
+    "otlp_endpoint_invalid": {
+        "en": "TRACE_OTLP_ENDPOINT must start with http:// or https://, got {endpoint}; OTLP export disabled",
+        "ru": "TRACE_OTLP_ENDPOINT должен начинаться с http:// или https://, получено {endpoint}; экспорт OTLP отключён",
+    },
+    "trace_file_error": {
+        "en": "Could not write trace file {path}: {error}",
+        "ru": "Не удалось записать файл трассировки {path}: {error}",
+    },
+    "otlp_export_error": {
+        "en": "Could not export {count} span(s) to the OTLP collector: {error}",
+        "ru": "Не удалось отправить {count} спан(ов) в OTLP-коллектор: {error}",
+    },
+    "profiler_started": {
+        "en": "Profiler started, send the signal again to stop and write the profile",
+        "ru": "Профилировщик запущен, отправьте сигнал ещё раз, чтобы остановить и сохранить профиль",
+    },
+    "profiler_stopped": {
+        "en": "Profiler stopped, {samples} sample(s) written to {path}",
+        "ru": "Профилировщик остановлен, {samples} сэмплов записано в {path}",
+    },
     # ===== gmail_monitor.py =====
     "console_auth_info": {
         "en": "Running in console mode (VPS/SSH detected). Open the URL in your browser and enter the code.",
@@ -258,8 +479,146 @@ MESSAGES: dict[str, dict[str, str]] = {
     },
 }
 
+# Telegram message layouts, one per message type.
+# {@key} inlines another message at compile time, {name} is filled in at render time.
+LAYOUTS: dict[str, str] = {
+    "tg_auth_link": "{@auth_link_header}\n\n{@time_label}: {time}\n\n{value}",
+    "tg_auth_mobile_link": "{@auth_mobile_link_header}\n\n{@time_label}: {time}\n\n{value}",
+    "tg_auth_code": "{@auth_code_header}\n\n{@code_label}: {value}\n{@time_label}: {time}",
+    "tg_payment_failed": (
+        "{@payment_failed_header}\n\n"
+        "{@payment_amount}: {amount}\n"
+        "{@payment_card}: •••• {card_last4}\n"
+        "{@time_label}: {time}\n\n"
+        "{@payment_action}"
+    ),
+    "tg_unknown": (
+        "{@new_email_header}\n\n"
+        "{@subject_label}: {subject}\n"
+        "{@time_label}: {time}\n\n"
+        "{@extraction_failed}"
+    ),
+    "tg_token_expired": (
+        "{@token_expired_tg_header}\n\n{@token_expired_tg_body}\n\n{@token_expired_tg_action}"
+    ),
+    "tg_startup": "{@bot_started}\n\n{@checking_email_interval}\n{@waiting_for_emails}",
+}
+
+SUPPORTED_LANGUAGES = ("en", "ru")
+
+_REFERENCE = re.compile(r"\{@(\w+)\}")
+_formatter = string.Formatter()
+
+
+def _fields(text: str) -> frozenset[str]:
+    """Placeholder names used in a message."""
+    return frozenset(name for _, name, _, _ in _formatter.parse(text) if name is not None)
+
+
+def _resolve(key: str, lang: str) -> str | None:
+    """Raw text of a message or layout in a language (falls back to English)."""
+    if key in LAYOUTS:
+        return _REFERENCE.sub(lambda m: _resolve(m.group(1), lang) or m.group(0), LAYOUTS[key])
+    msg_dict = MESSAGES.get(key)
+    if msg_dict is None:
+        return None
+    return msg_dict.get(lang, msg_dict.get("en"))
+
+
+def _compile(lang: str) -> dict[str, str]:
+    """Build the flat table of messages and inlined layouts for a language."""
+    catalog: dict[str, str] = {}
+    for key in (*MESSAGES, *LAYOUTS):
+        text = _resolve(key, lang)
+        if text is not None:
+            catalog[key] = text
+    return catalog
+
+
+def validate_catalog() -> list[str]:
+    """Check that every message exists in every language with the same fields
+    and that every layout reference resolves.
+
+    Returns:
+        list[str]: Problems found (empty if the catalog is complete)
+    """
+    problems: list[str] = []
+    for key, msg_dict in MESSAGES.items():
+        missing = [lang for lang in SUPPORTED_LANGUAGES if lang not in msg_dict]
+        if missing:
+            problems.append(f"{key}: missing {', '.join(missing)}")
+            continue
+        fields = {lang: _fields(msg_dict[lang]) for lang in SUPPORTED_LANGUAGES}
+        if len(set(fields.values())) > 1:
+            problems.append(f"{key}: placeholders differ between languages")
+    for key, layout in LAYOUTS.items():
+        for ref in _REFERENCE.findall(layout):
+            if ref not in MESSAGES:
+                problems.append(f"{key}: unknown message {{@{ref}}}")
+    return problems
+
+
+def _key_uses(path: str) -> list[tuple[int, str, set[str] | None]]:
+    """Find t()/t_for() calls with a literal key in a source file.
+
+    Returns:
+        list: (line, key, keyword names or None if **kwargs are passed)
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    uses: list[tuple[int, str, set[str] | None]] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name):
+            continue
+        key_index = {"t": 0, "t_for": 1}.get(node.func.id)
+        if key_index is None or len(node.args) <= key_index:
+            continue
+        key = node.args[key_index]
+        if not isinstance(key, ast.Constant) or not isinstance(key.value, str):
+            continue  # Built at runtime, e.g. f"tg_auth_{kind}"
+        names = {kw.arg for kw in node.keywords if kw.arg is not None}
+        spread = any(kw.arg is None for kw in node.keywords)
+        uses.append((node.lineno, key.value, None if spread else names))
+    return uses
+
+
+def validate_key_usage(sources: list[str]) -> list[str]:
+    """Check that every key used in the code exists and gets all of its placeholders.
+
+    Development/CI check (`python i18n.py`), not run at startup.
+
+    Args:
+        sources: Python files to scan for t()/t_for() calls
+
+    Returns:
+        list[str]: Problems found, with file and line
+    """
+    problems: list[str] = []
+    catalog = _get_catalog("en")
+    for path in sources:
+        for line, key, names in _key_uses(path):
+            where = f"{path}:{line}"
+            text = catalog.get(key)
+            if text is None:
+                problems.append(f"{where}: unknown message {key}")
+            elif names is not None and not _fields(text) <= names:
+                missing_fields = ", ".join(sorted(_fields(text) - names))
+                problems.append(f"{where}: {key} needs {missing_fields}")
+    return problems
+
+
+# Compiled catalogs per language (built on first use)
+_catalogs: dict[str, dict[str, str]] = {}
+
 # Current language (set from config)
 _current_lang: str = "ru"
+_catalog: dict[str, str] = {}
+
+
+def _get_catalog(lang: str) -> dict[str, str]:
+    if lang not in _catalogs:
+        _catalogs[lang] = _compile(lang)
+    return _catalogs[lang]
 
 
 def set_language(lang: str) -> None:
@@ -268,8 +627,9 @@ def set_language(lang: str) -> None:
     Args:
         lang: Language code ('en' or 'ru')
     """
-    global _current_lang
-    _current_lang = lang if lang in ("en", "ru") else "en"
+    global _current_lang, _catalog
+    _current_lang = lang if lang in SUPPORTED_LANGUAGES else "en"
+    _catalog = _get_catalog(_current_lang)
 
 
 def get_language() -> str:
@@ -281,14 +641,47 @@ def t(key: str, **kwargs: Any) -> str:
     """Get translated message.
 
     Args:
-        key: Message key
+        key: Message or layout key
         **kwargs: Format arguments
 
     Returns:
         Translated and formatted message
     """
-    msg_dict = MESSAGES.get(key, {})
-    msg = msg_dict.get(_current_lang, msg_dict.get("en", f"[{key}]"))
+    msg = _catalog.get(key)
+    if msg is None:
+        return f"[{key}]"
     if kwargs:
-        return msg.format(**kwargs)
+        return msg.format_map(kwargs)
     return msg
+
+
+def t_for(lang: str, key: str, **kwargs: Any) -> str:
+    """Get a message in a specific language (e.g. a recipient's preference).
+
+    Args:
+        lang: Language code
+        key: Message or layout key
+        **kwargs: Format arguments
+    """
+    msg = _get_catalog(lang if lang in SUPPORTED_LANGUAGES else "en").get(key)
+    if msg is None:
+        return f"[{key}]"
+    if kwargs:
+        return msg.format_map(kwargs)
+    return msg
+
+
+set_language(_current_lang)
+
+
+if __name__ == "__main__":
+    # CI check: python i18n.py [files...] (default: the bot's modules)
+    import sys
+
+    paths = sys.argv[1:] or sorted(
+        glob.glob(os.path.join(os.path.dirname(__file__) or ".", "*.py"))
+    )
+    found = validate_catalog() + validate_key_usage(paths)
+    for problem in found:
+        print(problem)
+    sys.exit(1 if found else 0)
@@ -1,11 +1,26 @@
 import asyncio
+import contextlib
+import json
 import logging
+import os
+import signal
 import sys
+import time
+from collections.abc import Awaitable
+from datetime import UTC, datetime
+from typing import Any
 
 import config
+from config_reload import ConfigWatcher, config_errors
 from gmail_monitor import GmailAPIError, GmailMonitor, TokenExpiredError
-from i18n import set_language, t
+from i18n import get_language, set_language, t, validate_catalog
+from outbox import Outbox
+from quota import PollPlanner
+from retry import ErrorClass, backoff_delay, breaker_states, classify_error, get_breaker
+from routing import RoutingIndex
 from telegram_bot import TelegramNotifier
+from tracing import SamplingProfiler, tracer
+from transport import GmailHttpPool
 
 # Setup logging
 logging.basicConfig(
@@ -13,19 +28,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Characters of an unparsed email body written to the log
+RAW_BODY_LOG_LIMIT = 4000
 
-def validate_config() -> None:
-    """Validate configuration at startup."""
-    errors: list[str] = []
-
-    if not getattr(config, "TELEGRAM_BOT_TOKEN", None):
-        errors.append(t("config_error_token"))
 
-    if not getattr(config, "ALLOWED_USER_IDS", None):
-        errors.append(t("config_error_users"))
-
-    if not getattr(config, "GMAIL_CREDENTIALS_FILE", None):
-        errors.append(t("config_error_gmail"))
+def validate_config() -> None:
+    """Validate configuration and message catalog at startup."""
+    errors = config_errors(config) + validate_catalog()
 
     if errors:
         logger.error(t("config_errors_header"))
@@ -36,6 +45,71 @@ def validate_config() -> None:
     logger.info(t("config_ok"))
 
 
+def save_outbox(outbox: Outbox) -> bool:
+    """Persist the outbox, logging (not raising) disk errors.
+
+    Returns:
+        bool: True if the outbox is on disk
+    """
+    try:
+        outbox.save()
+        return True
+    except OSError as e:
+        logger.error(t("outbox_save_error", path=outbox.path, error=e))
+        return False
+
+
+async def flush_acks(gmail: GmailMonitor, outbox: Outbox) -> None:
+    """Mark queued emails as read in Gmail.
+
+    Nothing is acknowledged unless the outbox was saved first, so an email is
+    never marked as read while its messages exist only in memory. Transient
+    failures stay pending for the next cycle; permanent ones (e.g. the email
+    was deleted) are dropped.
+    """
+    if not outbox.pending_acks or not save_outbox(outbox):
+        return
+    for msg_id in list(outbox.pending_acks):
+        error_class = await asyncio.to_thread(gmail.mark_as_read, msg_id)
+        if error_class is ErrorClass.PERMANENT:
+            logger.warning(t("ack_dropped", msg_id=msg_id))
+        if error_class is None or error_class is ErrorClass.PERMANENT:
+            outbox.ack_done(msg_id)
+    save_outbox(outbox)
+
+
+def log_raw_body(gmail: GmailMonitor, msg_id: str) -> None:
+    """Log the raw body of an email nothing could be extracted from (if RAW_BODY_CACHE_SIZE > 0)."""
+    body = gmail.get_raw_body(msg_id)
+    if body is not None:
+        logger.info(t("unparsed_email_body", msg_id=msg_id, body=body[:RAW_BODY_LOG_LIMIT]))
+
+
+async def sleep_or_poll(delay: float, poll_now: asyncio.Event) -> None:
+    """Sleep until the next poll, waking up early if /poll was requested."""
+    with contextlib.suppress(TimeoutError):
+        await asyncio.wait_for(poll_now.wait(), timeout=delay)
+    poll_now.clear()
+
+
+def write_health(path: str | None, planner: PollPlanner) -> None:
+    """Write circuit breaker and quota state to the health file (for healthchecks/metrics)."""
+    if not path:
+        return
+    state = {
+        "updated_at": int(time.time()),
+        "breakers": breaker_states(),
+        "gmail_quota": planner.snapshot(),
+    }
+    try:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(t("health_write_error", path=path, error=e))
+
+
 async def main() -> None:
     # Initialize language from config
     lang = getattr(config, "LANGUAGE", "ru")
@@ -47,49 +121,296 @@ async def main() -> None:
 
     validate_config()
 
-    gmail = GmailMonitor()
+    tracer.configure(
+        enabled=getattr(config, "TRACING_ENABLED", False),
+        json_file=getattr(config, "TRACE_FILE", None),
+        otlp_endpoint=getattr(config, "TRACE_OTLP_ENDPOINT", None),
+        slow_ms=getattr(config, "SLOW_STAGE_MS", None),
+    )
+
+    pool_size = getattr(config, "HTTP_POOL_SIZE", 4)
+    timeout = getattr(config, "HTTP_TIMEOUT", 30)
+    gmail = GmailMonitor(
+        raw_body_cache_size=getattr(config, "RAW_BODY_CACHE_SIZE", 0),
+        http_pool=GmailHttpPool(size=pool_size, timeout=timeout),
+        mailbox=getattr(config, "MAILBOX_NAME", "default"),
+    )
     telegram = TelegramNotifier()
+    outbox = Outbox(
+        getattr(config, "OUTBOX_FILE", "data/outbox.json"),
+        max_attempts=getattr(config, "OUTBOX_MAX_ATTEMPTS", 8),
+    )
+    outbox.load()
+
+    await telegram.start()
+    try:
+        logger.info(t("gmail_auth_start"))
+        gmail.authenticate()
+
+        logger.info(t("telegram_startup"))
+        await telegram.send_startup_message(RoutingIndex.from_config(config, get_language()))
+
+        logger.info(t("monitoring_start", interval=config.CHECK_INTERVAL))
+        stop = StopEvent(getattr(config, "SHUTDOWN_TIMEOUT", 8))
+        poll_now = asyncio.Event()
+        install_signal_handlers(stop, poll_now)
+        await monitor(gmail, telegram, outbox, stop, poll_now)
+        logger.info(t("bot_stopped"))
+    finally:
+        await telegram.close()
+        gmail.close()
+
+
+class StopEvent(asyncio.Event):
+    """Stop request that also starts the shutdown deadline (SHUTDOWN_TIMEOUT).
+
+    The deadline is fixed when the stop is requested, so a poll or ack that is
+    already running shares the budget with the final drain.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        super().__init__()
+        self.timeout = timeout
+        self.deadline: float | None = None
+
+    def set(self) -> None:
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.timeout
+        super().set()
 
-    logger.info(t("gmail_auth_start"))
-    gmail.authenticate()
+    def remaining(self) -> float:
+        """Seconds left until the shutdown deadline (infinite before a stop request)."""
+        if self.deadline is None:
+            return float("inf")
+        return max(0.0, self.deadline - time.monotonic())
 
-    logger.info(t("telegram_startup"))
-    await telegram.send_startup_message()
 
-    logger.info(t("monitoring_start", interval=config.CHECK_INTERVAL))
+class ShutdownDeadline(Exception):
+    """In-flight work did not finish before the shutdown deadline."""
+
+
+async def until_deadline(awaitable: Awaitable[Any], stop: StopEvent) -> Any:
+    """Await `awaitable`, giving up once a stop was requested and its deadline passed.
+
+    Raises:
+        ShutdownDeadline: If the deadline passed first (a worker thread may still be
+            running; its result is discarded)
+    """
+    task = asyncio.ensure_future(awaitable)
+    waiter = asyncio.ensure_future(stop.wait())
+    try:
+        await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            await asyncio.wait({task}, timeout=stop.remaining())
+    finally:
+        waiter.cancel()
+    if not task.done():
+        task.cancel()
+        raise ShutdownDeadline
+    return task.result()
+
+
+def install_signal_handlers(stop: asyncio.Event, poll_now: asyncio.Event) -> None:
+    """Stop gracefully on SIGTERM (docker stop) and SIGINT (Ctrl+C), profile on SIGUSR2."""
+    loop = asyncio.get_running_loop()
+
+    def request_stop(signame: str) -> None:
+        logger.info(t("shutdown_requested", signal=signame))
+        stop.set()
+        # Wake up the monitoring loop if it is sleeping
+        poll_now.set()
+        # A second Ctrl+C / SIGTERM force-quits a stuck shutdown
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(sig)
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        # Not supported on Windows: Ctrl+C still raises KeyboardInterrupt there
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, request_stop, sig.name)
+
+    # On-demand profiling of a running bot: first SIGUSR2 starts, second writes the profile
+    if hasattr(signal, "SIGUSR2"):
+        profiler = SamplingProfiler()
+        profile_dir = getattr(config, "PROFILE_DIR", ".")
+        loop.add_signal_handler(signal.SIGUSR2, profiler.toggle, profile_dir)
+
+
+async def shutdown(
+    gmail: GmailMonitor,
+    outbox: Outbox,
+    delivery: asyncio.Task,
+    commands: asyncio.Task,
+    stop: StopEvent,
+    ack_gmail: bool = True,
+) -> None:
+    """Finish in-flight work before the shutdown deadline: deliver due messages,
+    flush pending acks and persist the outbox.
+
+    With `ack_gmail=False` (Gmail token is gone) pending acks are only saved
+    for the next run.
+    """
+    stop.set()
+    commands.cancel()
+
+    while outbox.has_due(time.time()) and stop.remaining() > 0:
+        await asyncio.sleep(0.1)
+    delivery.cancel()
+    await asyncio.gather(delivery, commands, return_exceptions=True)
+
+    if ack_gmail and stop.remaining() > 0:
+        try:
+            await until_deadline(flush_acks(gmail, outbox), stop)
+        except Exception as e:
+            logger.error(t("shutdown_ack_error", error=e))
+
+    save_outbox(outbox)
+    if tracer.enabled:
+        with contextlib.suppress(ShutdownDeadline):
+            await until_deadline(asyncio.to_thread(tracer.flush), stop)
+    logger.info(
+        t("shutdown_complete", undelivered=len(outbox), pending_acks=len(outbox.pending_acks))
+    )
+
+
+async def monitor(
+    gmail: GmailMonitor,
+    telegram: TelegramNotifier,
+    outbox: Outbox,
+    stop: StopEvent,
+    poll_now: asyncio.Event,
+) -> None:
+    """Poll Gmail and queue notifications until `stop` is set, then shut down gracefully.
+
+    Gmail calls run in a worker thread, so delivery and bot commands keep
+    running on the event loop while a poll is in progress. Config changes are
+    picked up between polls. A poll that is already running when a stop is
+    requested completes (emails are queued and acknowledged) before shutdown.
+    """
+    gmail_breaker = get_breaker(
+        "gmail",
+        failure_threshold=getattr(config, "BREAKER_FAILURE_THRESHOLD", 5),
+        reset_timeout=getattr(config, "BREAKER_RESET_TIMEOUT", 60),
+    )
+    planner = PollPlanner(gmail.quota, budget=getattr(config, "GMAIL_QUOTA_BUDGET", 6000))
+    health_file = getattr(config, "HEALTH_FILE", None)
+    watcher = ConfigWatcher() if getattr(config, "CONFIG_RELOAD", True) else None
+    routing = RoutingIndex.from_config(config, get_language())
+    last_poll: datetime | None = None
+    failures = 0
+
+    def get_status() -> dict[str, Any]:
+        """Monitoring state for /status (cached values only, no Gmail calls)."""
+        expiry = gmail.creds.expiry if gmail.creds else None
+        return {
+            "last_poll": last_poll.strftime("%H:%M:%S") if last_poll else None,
+            "token_expiry": (
+                expiry.replace(tzinfo=UTC).astimezone().strftime("%H:%M:%S") if expiry else "—"
+            ),
+            "outbox": len(outbox),
+            "pending_acks": len(outbox.pending_acks),
+            "quota": planner.snapshot(),
+            "breakers": breaker_states(),
+        }
+
+    delivery = asyncio.create_task(telegram.run_delivery(outbox))
+    commands = asyncio.create_task(telegram.run_commands(get_status, poll_now, lambda: routing))
+
+    while not stop.is_set():
+        if watcher and watcher.check():
+            routing = RoutingIndex.from_config(config, get_language())
+        write_health(health_file, planner)
+        if not gmail_breaker.allow():
+            logger.info(t("gmail_breaker_open", delay=gmail_breaker.retry_in()))
+            await sleep_or_poll(gmail_breaker.retry_in(), poll_now)
+            continue
 
-    while True:
         try:
-            emails = gmail.get_unread_claude_emails()
+            # Acks left over from a failed cycle or a previous run
+            await until_deadline(flush_acks(gmail, outbox), stop)
+            if stop.is_set():
+                break
+
+            # /poll skips the planned interval, but not the quota budget
+            quota_wait = planner.quota_wait()
+            if quota_wait > 0:
+                logger.info(t("quota_wait", delay=quota_wait))
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(stop.wait(), timeout=quota_wait)
+                if stop.is_set():
+                    break
+
+            emails = await until_deadline(
+                asyncio.to_thread(gmail.get_unread_claude_emails, max_results=planner.batch_size()),
+                stop,
+            )
+            last_poll = datetime.now()
+            planner.observe(len(emails))
 
             if emails:
                 logger.info(t("emails_found", count=len(emails)))
 
                 for email in emails:
-                    sent = await telegram.send_code(email)
-                    if sent:
-                        gmail.mark_as_read(email["id"])
-                    else:
-                        logger.warning(t("telegram_not_sent"))
+                    if outbox.is_known(email.id):
+                        # Already queued earlier, only the Gmail ack is missing
+                        outbox.request_ack(email.id)
+                        continue
+                    with tracer.span("route", email.id):
+                        recipients = routing.recipients(email.mailbox, email.kind, email.sender)
+                        # Render once per recipient language
+                        for lang, user_ids in routing.group_by_language(recipients).items():
+                            message = telegram.format_code_message(email, lang=lang)
+                            outbox.enqueue(email.id, message, user_ids)
+                    telegram.remember(email)
+                    logger.info(t("email_queued", msg_id=email.id, count=len(recipients)))
+                    if email.kind == "unknown":
+                        log_raw_body(gmail, email.id)
+
+                # Saves the outbox, then acknowledges the emails in Gmail
+                await until_deadline(flush_acks(gmail, outbox), stop)
             else:
                 logger.debug(t("no_new_emails"))
 
-            await asyncio.sleep(config.CHECK_INTERVAL)
+            gmail_breaker.record_success()
+            failures = 0
+            if tracer.enabled:
+                await until_deadline(asyncio.to_thread(tracer.flush), stop)
+            interval = planner.next_interval(config.CHECK_INTERVAL)
+            logger.debug(
+                t(
+                    "quota_status",
+                    used=planner.budget - planner.headroom(),
+                    budget=planner.budget,
+                    interval=interval,
+                )
+            )
+            await sleep_or_poll(interval, poll_now)
+
+        except ShutdownDeadline:
+            # Stop requested and the in-flight Gmail call ran out of time
+            break
 
         except TokenExpiredError as e:
             logger.error(str(e))
-            await telegram.send_token_expired_message()
+            await telegram.send_token_expired_message(routing)
+            await shutdown(gmail, outbox, delivery, commands, stop, ack_gmail=False)
             logger.info(t("bot_stopped_token_expired"))
             sys.exit(1)
 
         except GmailAPIError as e:
             logger.error(t("gmail_api_error", error=e))
-            logger.info(t("retry_in_30"))
-            await asyncio.sleep(30)
+            gmail_breaker.record_failure()
+            failures += 1
+            delay = backoff_delay(e.error_class, failures)
+            logger.info(t("retry_in", delay=delay))
+            await sleep_or_poll(delay, poll_now)
 
         except Exception as e:
             logger.exception(t("unexpected_error", error=e))
-            await asyncio.sleep(30)
+            gmail_breaker.record_failure()
+            failures += 1
+            await sleep_or_poll(backoff_delay(classify_error(e), failures), poll_now)
+
+    await shutdown(gmail, outbox, delivery, commands, stop)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""Durable per-recipient Telegram outbox.
+
+Rendered notifications are queued once per recipient and persisted to disk, so
+an email can be acknowledged in Gmail as soon as its messages are queued.
+Failed sends are retried for each recipient independently.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from i18n import t
+
+logger = logging.getLogger(__name__)
+
+# How many acknowledged email IDs to remember for de-duplication
+SEEN_LIMIT = 500
+
+
+@dataclass
+class OutboxEntry:
+    """A single message waiting to be delivered to one chat."""
+
+    entry_id: str
+    email_id: str
+    chat_id: int
+    text: str
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+
+
+class Outbox:
+    def __init__(self, path: str, max_attempts: int = 8) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        self.entries: dict[str, OutboxEntry] = {}
+        self.pending_acks: list[str] = []
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def load(self) -> None:
+        """Restore queued messages and pending acknowledgements from disk.
+
+        An unreadable file is renamed to `<path>.corrupt-<time>` rather than overwritten by
+        the next save(): its messages belong to emails already marked as read.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            entries = [OutboxEntry(**raw) for raw in state.get("entries", [])]
+            pending_acks = list(state.get("pending_acks", []))
+            seen = list(state.get("seen", []))
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            corrupt_path = f"{self.path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+            os.replace(self.path, corrupt_path)
+            logger.error(t("outbox_load_error", path=self.path, backup=corrupt_path, error=e))
+            return
+
+        for entry in entries:
+            self.entries[entry.entry_id] = entry
+        self.pending_acks = pending_acks
+        for email_id in seen:
+            self._seen[email_id] = None
+
+        if self.entries:
+            logger.info(t("outbox_restored", count=len(self.entries)))
+
+    def save(self) -> None:
+        """Persist the outbox atomically (write to temp file, then rename)."""
+        state: dict[str, Any] = {
+            "entries": [asdict(e) for e in self.entries.values()],
+            "pending_acks": self.pending_acks,
+            "seen": list(self._seen),
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def is_known(self, email_id: str) -> bool:
+        """Check if messages for this email were already queued."""
+        return email_id in self._seen
+
+    def enqueue(self, email_id: str, text: str, recipients: list[int]) -> None:
+        """Queue a message for every recipient and schedule the email for acknowledgement.
+
+        The caller must call save() before acknowledging the email in Gmail.
+        """
+        for chat_id in recipients:
+            entry = OutboxEntry(
+                entry_id=uuid.uuid4().hex, email_id=email_id, chat_id=chat_id, text=text
+            )
+            self.entries[entry.entry_id] = entry
+        self._seen[email_id] = None
+        while len(self._seen) > SEEN_LIMIT:
+            self._seen.popitem(last=False)
+        self.request_ack(email_id)
+        self._wakeup.set()
+
+    def request_ack(self, email_id: str) -> None:
+        """Schedule an email to be marked as read."""
+        if email_id not in self.pending_acks:
+            self.pending_acks.append(email_id)
+
+    def ack_done(self, email_id: str) -> None:
+        """Forget an acknowledged email."""
+        if email_id in self.pending_acks:
+            self.pending_acks.remove(email_id)
+
+    def due(self, now: float) -> list[OutboxEntry]:
+        """Get entries whose next attempt time has come.
+
+        Times are wall-clock (time.time()) so schedules survive restarts.
+        """
+        self._wakeup.clear()
+        return [e for e in self.entries.values() if e.next_attempt_at <= now]
+
+    def has_due(self, now: float) -> bool:
+        """Check if any entry is due for delivery."""
+        return any(e.next_attempt_at <= now for e in self.entries.values())
+
+    def delivered(self, entry: OutboxEntry) -> None:
+        """Remove a successfully delivered entry."""
+        self.entries.pop(entry.entry_id, None)
+
+    def reschedule(self, entry: OutboxEntry, now: float, delay: float | None) -> bool:
+        """Schedule the next attempt after `delay` seconds.
+
+        The entry is dropped if `delay` is None (permanent error) or attempts are exhausted.
+
+        Returns:
+            bool: False if the entry was dropped
+        """
+        entry.attempts += 1
+        if delay is None or entry.attempts >= self.max_attempts:
+            self.entries.pop(entry.entry_id, None)
+            return False
+
+        entry.next_attempt_at = now + delay
+        return True
+
+    def next_due_in(self, now: float) -> float | None:
+        """Seconds until the earliest entry is due (None if the outbox is empty)."""
+        if not self.entries:
+            return None
+        return max(0.0, min(e.next_attempt_at for e in self.entries.values()) - now)
+
+    async def wait_for_work(self, timeout: float | None) -> None:
+        """Sleep until new entries are queued or the timeout expires."""
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
@@ -0,0 +1,123 @@
+"""Gmail API quota accounting and budget-driven poll planning."""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Any
+
+# Quota units per Gmail API call
+# https://developers.google.com/gmail/api/reference/quota
+QUOTA_UNITS: dict[str, int] = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "messages.modify": 5,
+    "messages.batchModify": 50,
+    "history.list": 2,
+    "getProfile": 1,
+}
+
+
+class QuotaLedger:
+    """Sliding-window counter of quota units spent on one mailbox."""
+
+    def __init__(self, window: float = 60.0) -> None:
+        self.window = window
+        self.total_units = 0
+        self.calls: Counter[str] = Counter()
+        self._events: deque[tuple[float, int]] = deque()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def record(self, method: str) -> None:
+        """Record one API call."""
+        units = QUOTA_UNITS.get(method, 5)
+        with self._lock:
+            self._events.append((time.monotonic(), units))
+            self._used += units
+            self.total_units += units
+            self.calls[method] += 1
+
+    def _expire(self, now: float) -> None:
+        while self._events and self._events[0][0] <= now - self.window:
+            self._used -= self._events.popleft()[1]
+
+    def used(self) -> int:
+        """Units spent within the current window."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._used
+
+    def time_until_free(self, units: int, budget: int) -> float:
+        """Seconds until `units` more can be spent without exceeding `budget` in the window."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            excess = self._used + units - budget
+            if excess <= 0:
+                return 0.0
+            for ts, spent in self._events:
+                excess -= spent
+                if excess <= 0:
+                    return max(0.0, ts + self.window - now)
+            return self.window
+
+
+class PollPlanner:
+    """Pick the fastest poll cadence and batch size that stay under the quota budget.
+
+    A poll costs one `messages.list` plus a `get` and a `modify` per email found.
+    The expected number of emails per poll is tracked as a moving average.
+    """
+
+    def __init__(self, ledger: QuotaLedger, budget: int, max_batch: int = 10) -> None:
+        self.ledger = ledger
+        self.budget = budget
+        self.max_batch = max_batch
+        self.expected_emails = 0.0
+        self.last_interval = 0.0
+
+    @property
+    def per_email_cost(self) -> int:
+        return QUOTA_UNITS["messages.get"] + QUOTA_UNITS["messages.modify"]
+
+    def observe(self, emails_found: int) -> None:
+        """Update the moving average of emails per poll."""
+        self.expected_emails = 0.8 * self.expected_emails + 0.2 * emails_found
+
+    def headroom(self) -> int:
+        """Units left in the current window."""
+        return max(0, self.budget - self.ledger.used())
+
+    def batch_size(self) -> int:
+        """Max emails to fetch in the next poll (at least 1)."""
+        spare = self.headroom() - QUOTA_UNITS["messages.list"]
+        return max(1, min(self.max_batch, spare // self.per_email_cost))
+
+    def quota_wait(self) -> float:
+        """Seconds until one more poll fits in the budget (0 if it fits now)."""
+        next_poll_cost = QUOTA_UNITS["messages.list"] + self.per_email_cost
+        return self.ledger.time_until_free(next_poll_cost, self.budget)
+
+    def next_interval(self, min_interval: float) -> float:
+        """Seconds to wait before the next poll.
+
+        Never faster than `min_interval`; slower when the steady-state cost of
+        polling or the units already spent in the window would exceed the budget.
+        """
+        poll_cost = QUOTA_UNITS["messages.list"] + self.expected_emails * self.per_email_cost
+        sustainable = self.ledger.window * poll_cost / self.budget
+        self.last_interval = max(min_interval, sustainable, self.quota_wait())
+        return self.last_interval
+
+    def snapshot(self) -> dict[str, Any]:
+        """Quota usage for health checks and tuning."""
+        used = self.ledger.used()
+        return {
+            "budget": self.budget,
+            "used": used,
+            "headroom": max(0, self.budget - used),
+            "window": self.ledger.window,
+            "interval": round(self.last_interval, 1),
+            "total_units": self.ledger.total_units,
+            "calls": dict(self.ledger.calls),
+        }
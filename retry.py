@@ -0,0 +1,210 @@
+"""Retry policy: error classification, jittered backoff and circuit breakers."""
+
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from enum import Enum
+from typing import Any
+
+from google.auth.exceptions import RefreshError
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
+from telegram.error import (
+    BadRequest,
+    ChatMigrated,
+    Forbidden,
+    InvalidToken,
+    NetworkError,
+    RetryAfter,
+)
+
+from i18n import t
+
+logger = logging.getLogger(__name__)
+
+# Gmail 403 reasons that mean "slow down" rather than "not allowed"
+_RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "backendError"}
+
+
+class ErrorClass(Enum):
+    """How an error should be retried."""
+
+    TRANSIENT = "transient"  # 429, 5xx, network errors: retry soon
+    AUTH = "auth"  # 401, revoked/expired token: re-authenticate
+    PERMANENT = "permanent"  # other 4xx: retrying won't help soon
+
+
+@dataclass(frozen=True)
+class BackoffPolicy:
+    """Exponential backoff with equal jitter: delay is in [d/2, d], d = base * 2**(attempt - 1)."""
+
+    base: float
+    cap: float
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.cap, self.base * 2 ** max(attempt - 1, 0))
+        return random.uniform(delay / 2, delay)  # nosec B311
+
+
+BACKOFF: dict[ErrorClass, BackoffPolicy] = {
+    ErrorClass.TRANSIENT: BackoffPolicy(base=2.0, cap=300.0),
+    ErrorClass.AUTH: BackoffPolicy(base=5.0, cap=60.0),
+    ErrorClass.PERMANENT: BackoffPolicy(base=60.0, cap=900.0),
+}
+
+
+def _gmail_reasons(error: HttpError) -> set[str]:
+    """Collect `reason` values from a Gmail API error response."""
+    details = error.error_details if isinstance(error.error_details, list) else []
+    return {d["reason"] for d in details if isinstance(d, dict) and "reason" in d}
+
+
+def classify_error(error: BaseException) -> ErrorClass:
+    """Classify a Gmail or Telegram error by HTTP status and reason."""
+    if isinstance(error, RefreshError):
+        # Token endpoint 5xx/timeouts are flagged retryable; invalid_grant etc. are not
+        if getattr(error, "retryable", False):
+            return ErrorClass.TRANSIENT
+        return ErrorClass.AUTH
+
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status == 401:
+            return ErrorClass.AUTH
+        if status == 429 or status >= 500:
+            return ErrorClass.TRANSIENT
+        if status == 403 and _gmail_reasons(error) & _RATE_LIMIT_REASONS:
+            return ErrorClass.TRANSIENT
+        return ErrorClass.PERMANENT
+
+    if isinstance(error, InvalidToken):
+        return ErrorClass.AUTH
+    # BadRequest is a NetworkError subclass, so check it first
+    if isinstance(error, Forbidden | BadRequest | ChatMigrated):
+        return ErrorClass.PERMANENT
+    if isinstance(error, RetryAfter | NetworkError | HttpLib2Error | OSError):
+        return ErrorClass.TRANSIENT
+
+    # Unknown errors are retried like transient ones
+    return ErrorClass.TRANSIENT
+
+
+def backoff_delay(error_class: ErrorClass, attempt: int) -> float:
+    """Get a jittered delay (seconds) for the given error class and attempt number (1-based)."""
+    return BACKOFF[error_class].delay(attempt)
+
+
+def retry_delay(error: BaseException, attempt: int) -> float | None:
+    """Get the delay before retrying after an error.
+
+    Returns:
+        float | None: Delay in seconds, or None if the error is permanent
+    """
+    if isinstance(error, RetryAfter):
+        retry_after = error.retry_after
+        if isinstance(retry_after, timedelta):
+            return retry_after.total_seconds()
+        return float(retry_after)
+
+    error_class = classify_error(error)
+    if error_class is ErrorClass.PERMANENT:
+        return None
+    return backoff_delay(error_class, attempt)
+
+
+class CircuitBreaker:
+    """Circuit breaker for one dependency (Gmail, Telegram).
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_timeout` seconds, letting a single probe through;
+    half_open -> closed on success, back to open on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_count = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self.retry_in() == 0:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed (0 if calls are allowed now)."""
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Check if a call may be made now."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info(t("breaker_closed", name=self.name))
+        self._state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opened_count += 1
+                logger.warning(
+                    t(
+                        "breaker_opened",
+                        name=self.name,
+                        failures=self.failures,
+                        delay=self.reset_timeout,
+                    )
+                )
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict[str, Any]:
+        """Breaker state for health checks and metrics."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_count": self.opened_count,
+            "retry_in": round(self.retry_in(), 1),
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(
+    name: str, failure_threshold: int = 5, reset_timeout: float = 60.0
+) -> CircuitBreaker:
+    """Get (or create) the circuit breaker for a dependency."""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+    return _breakers[name]
+
+
+def breaker_states() -> dict[str, dict[str, Any]]:
+    """Snapshot of all circuit breakers."""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
@@ -0,0 +1,143 @@
+"""Per-recipient routing of notifications.
+
+Routing rules are compiled into a lookup index keyed on
+(mailbox, email type, sender), so choosing recipients for an email is a
+handful of dict lookups regardless of how many rules there are.
+"""
+
+import logging
+from collections import defaultdict
+from email.utils import parseaddr
+from typing import Any
+
+from i18n import SUPPORTED_LANGUAGES, t
+
+logger = logging.getLogger(__name__)
+
+# Extraction types an email can have (see EmailRecord.kind)
+EMAIL_TYPES = ("link", "mobile_link", "code", "payment_failed", "unknown")
+
+WILDCARD = "*"
+
+# Upper bound for memoized recipient lists
+CACHE_LIMIT = 1024
+
+
+def _sender_keys(sender: str) -> list[str]:
+    """Index keys a sender matches: full address, its domain and parent domains, wildcard."""
+    address = parseaddr(sender)[1].lower()
+    keys = [WILDCARD]
+    if not address:
+        return keys
+    keys.append(address)
+    domain = address.rpartition("@")[2]
+    labels = domain.split(".")
+    # mail.anthropic.com -> mail.anthropic.com, anthropic.com
+    for i in range(len(labels) - 1):
+        keys.append(".".join(labels[i:]))
+    return keys
+
+
+def routing_errors(cfg: Any) -> list[str]:
+    """Validate ROUTING_RULES and USER_LANGUAGES of a config module."""
+    errors: list[str] = []
+    allowed = set(getattr(cfg, "ALLOWED_USER_IDS", None) or [])
+
+    for i, rule in enumerate(getattr(cfg, "ROUTING_RULES", None) or []):
+        if not isinstance(rule, dict) or not rule.get("users"):
+            errors.append(t("routing_error_users", rule=i + 1))
+            continue
+        unknown_users = [u for u in rule["users"] if u not in allowed]
+        if unknown_users:
+            errors.append(
+                t("routing_error_not_allowed", rule=i + 1, users=", ".join(map(str, unknown_users)))
+            )
+        unknown_types = [k for k in rule.get("types", []) if k not in EMAIL_TYPES]
+        if unknown_types:
+            errors.append(t("routing_error_types", rule=i + 1, types=", ".join(unknown_types)))
+
+    for user_id, language in (getattr(cfg, "USER_LANGUAGES", None) or {}).items():
+        if language not in SUPPORTED_LANGUAGES:
+            errors.append(t("routing_error_language", user_id=user_id, language=language))
+
+    return errors
+
+
+class RoutingIndex:
+    def __init__(
+        self,
+        rules: list[dict[str, Any]],
+        default_users: list[int],
+        user_languages: dict[int, str] | None = None,
+        default_language: str = "en",
+    ) -> None:
+        """Compile routing rules.
+
+        Args:
+            rules: Dicts with "users" and optional "mailboxes", "types", "senders" lists
+                (a missing filter matches everything)
+            default_users: Recipients of everything when there are no rules, and of
+                emails no rule matches (so no email is acknowledged unseen)
+            user_languages: Per-user language overrides
+            default_language: Language for users without an override
+        """
+        index: defaultdict[tuple[str, str, str], set[int]] = defaultdict(set)
+        if not rules:
+            index[WILDCARD, WILDCARD, WILDCARD].update(default_users)
+        for rule in rules:
+            for mailbox in rule.get("mailboxes") or [WILDCARD]:
+                for kind in rule.get("types") or [WILDCARD]:
+                    for sender in rule.get("senders") or [WILDCARD]:
+                        index[mailbox, kind, sender.lower()].update(rule["users"])
+
+        self._index = {key: frozenset(users) for key, users in index.items()}
+        self._cache: dict[tuple[str, str, str], list[int]] = {}
+        self.default_users = sorted(set(default_users))
+        self.user_languages = user_languages or {}
+        self.default_language = default_language
+
+    @classmethod
+    def from_config(cls, cfg: Any, default_language: str) -> "RoutingIndex":
+        return cls(
+            getattr(cfg, "ROUTING_RULES", None) or [],
+            list(cfg.ALLOWED_USER_IDS),
+            getattr(cfg, "USER_LANGUAGES", None),
+            default_language,
+        )
+
+    def recipients(self, mailbox: str, kind: str, sender: str) -> list[int]:
+        """Users subscribed to an email (cached per mailbox, type and sender).
+
+        Falls back to all default users when no rule matches.
+        """
+        cache_key = (mailbox, kind, sender)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        users: set[int] = set()
+        sender_keys = _sender_keys(sender)
+        for mailbox_key in (mailbox, WILDCARD):
+            for kind_key in (kind, WILDCARD):
+                for sender_key in sender_keys:
+                    users.update(self._index.get((mailbox_key, kind_key, sender_key), ()))
+
+        if users:
+            result = sorted(users)
+        else:
+            logger.warning(t("routing_no_match", mailbox=mailbox, kind=kind, sender=sender))
+            result = self.default_users
+        if len(self._cache) >= CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[cache_key] = result
+        return result
+
+    def language(self, user_id: int) -> str:
+        return self.user_languages.get(user_id, self.default_language)
+
+    def group_by_language(self, user_ids: list[int]) -> dict[str, list[int]]:
+        """Split recipients by language, so each message is rendered once per language."""
+        groups: dict[str, list[int]] = {}
+        for user_id in user_ids:
+            groups.setdefault(self.language(user_id), []).append(user_id)
+        return groups
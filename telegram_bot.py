@@ -1,34 +1,73 @@
+import asyncio
 import logging
+import time
+from collections import deque
+from collections.abc import Callable
 from datetime import datetime
 from typing import Any
 
-from telegram import Bot
+from telegram.constants import ChatType
 from telegram.error import TelegramError
 
 import config
-from i18n import t
+from gmail_monitor import EmailRecord
+from i18n import get_language, t, t_for
+from outbox import Outbox
+from retry import ErrorClass, backoff_delay, classify_error, get_breaker, retry_delay
+from routing import RoutingIndex
+from tracing import tracer
+from transport import GET_UPDATES_TIMEOUT, create_telegram_bot
 
 logger = logging.getLogger(__name__)
 
 
 class TelegramNotifier:
     def __init__(self) -> None:
-        self.bot = Bot(token=config.TELEGRAM_BOT_TOKEN)
+        self.bot = create_telegram_bot(
+            config.TELEGRAM_BOT_TOKEN,
+            pool_size=getattr(config, "HTTP_POOL_SIZE", 4),
+            timeout=getattr(config, "HTTP_TIMEOUT", 30),
+            http2=getattr(config, "TELEGRAM_HTTP2", False),
+        )
+        # Ring buffer of recent extraction results served by /last
+        self.recent: deque[tuple[datetime, EmailRecord]] = deque(
+            maxlen=getattr(config, "RECENT_CODES_SIZE", 10)
+        )
+
+    async def start(self) -> None:
+        """Open the connection pool."""
+        await self.bot.initialize()
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        await self.bot.shutdown()
 
-    async def _broadcast(self, message: str, log_success: bool = True) -> int:
-        """Send message to all allowed users.
+    async def _broadcast(
+        self,
+        key: str,
+        language: Callable[[int], str],
+        log_success: bool = True,
+        **kwargs: Any,
+    ) -> int:
+        """Send a message to all allowed users, each in their own language.
 
         Args:
-            message: Message text
+            key: Message or layout key
+            language: Returns the language of a user (e.g. RoutingIndex.language)
             log_success: Log successful sends
+            **kwargs: Format arguments
 
         Returns:
             int: Number of successful sends
         """
         success_count = 0
+        rendered: dict[str, str] = {}
         for user_id in config.ALLOWED_USER_IDS:
+            lang = language(user_id)
+            if lang not in rendered:
+                rendered[lang] = t_for(lang, key, **kwargs)
             try:
-                await self.bot.send_message(chat_id=user_id, text=message)
+                await self.bot.send_message(chat_id=user_id, text=rendered[lang])
                 if log_success:
                     logger.info(t("msg_sent_to_user", user_id=user_id))
                 success_count += 1
@@ -36,64 +75,215 @@ class TelegramNotifier:
                 logger.error(t("msg_send_error", user_id=user_id, error=e))
         return success_count
 
-    def _format_auth_message(self, auth_data: dict[str, str], time_now: str) -> str:
-        """Format message with auth data."""
-        time_label = t("time_label")
-        if auth_data["type"] == "link":
-            header = t("auth_link_header")
-            return f"{header}\n\n{time_label}: {time_now}\n\n{auth_data['value']}"
-        if auth_data["type"] == "mobile_link":
-            header = t("auth_mobile_link_header")
-            return f"{header}\n\n{time_label}: {time_now}\n\n{auth_data['value']}"
-        header = t("auth_code_header")
-        code_label = t("code_label")
-        return f"{header}\n\n{code_label}: {auth_data['value']}\n{time_label}: {time_now}"
-
-    async def send_code(self, email_data: dict[str, Any]) -> bool:
-        """Send auth code/link to all allowed users.
+    def format_code_message(
+        self, email: EmailRecord, received: datetime | None = None, lang: str | None = None
+    ) -> str:
+        """Render the notification for an email (auth code/link, payment or unparsed).
 
-        Returns:
-            bool: True if sent to at least one user successfully
+        Args:
+            email: Processed email
+            received: Time shown in the message (now by default)
+            lang: Recipient language (current language by default)
         """
-        time_now = datetime.now().strftime("%H:%M:%S")
-        auth_data = email_data.get("auth_data")
-        payment_data = email_data.get("payment_data")
+        time_now = (received or datetime.now()).strftime("%H:%M:%S")
+        lang = lang or get_language()
+        auth_data = email.auth_data
+        payment_data = email.payment_data
 
         if auth_data:
-            message = self._format_auth_message(auth_data, time_now)
-        elif payment_data:
-            message = (
-                f"{t('payment_failed_header')}\n\n"
-                f"{t('payment_amount')}: {payment_data['amount']}\n"
-                f"{t('payment_card')}: •••• {payment_data['card_last4']}\n"
-                f"{t('time_label')}: {time_now}\n\n"
-                f"{t('payment_action')}"
+            return t_for(
+                lang, f"tg_auth_{auth_data['type']}", time=time_now, value=auth_data["value"]
             )
-        else:
-            subject = email_data.get("subject", t("no_subject"))
-            message = (
-                f"{t('new_email_header')}\n\n"
-                f"{t('subject_label')}: {subject}\n"
-                f"{t('time_label')}: {time_now}\n\n"
-                f"{t('extraction_failed')}"
+        if payment_data:
+            return t_for(
+                lang,
+                "tg_payment_failed",
+                amount=payment_data["amount"],
+                card_last4=payment_data["card_last4"],
+                time=time_now,
             )
+        return t_for(lang, "tg_unknown", subject=email.subject, time=time_now)
 
-        return await self._broadcast(message) > 0
+    def remember(self, email: EmailRecord) -> None:
+        """Store an extraction result in the ring buffer served by /last."""
+        self.recent.append((datetime.now(), email))
 
-    async def send_token_expired_message(self) -> None:
-        """Send notification that Gmail token has expired."""
-        message = (
-            f"{t('token_expired_tg_header')}\n\n"
-            f"{t('token_expired_tg_body')}\n\n"
-            f"{t('token_expired_tg_action')}"
+    async def run_commands(
+        self,
+        get_status: Callable[[], dict[str, Any]],
+        poll_now: asyncio.Event,
+        get_routing: Callable[[], RoutingIndex],
+    ) -> None:
+        """Answer commands from allowed users via long polling.
+
+        Runs until cancelled. Answers are served from memory and never call Gmail.
+
+        Args:
+            get_status: Returns monitoring state for /status
+            poll_now: Set by /poll to wake up the monitoring loop
+            get_routing: Returns the current routing index (/last shows only routed codes)
+        """
+        offset = 0
+        failures = 0
+        while True:
+            try:
+                updates = await self.bot.get_updates(
+                    offset=offset, timeout=GET_UPDATES_TIMEOUT, allowed_updates=["message"]
+                )
+                failures = 0
+            except TelegramError as e:
+                failures += 1
+                delay = retry_delay(e, failures) or backoff_delay(ErrorClass.PERMANENT, failures)
+                logger.warning(t("commands_poll_error", delay=delay, error=e))
+                await asyncio.sleep(delay)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                message = update.message
+                if not message or not message.text or not message.from_user:
+                    continue
+                user_id = message.from_user.id
+                if user_id not in config.ALLOWED_USER_IDS:
+                    logger.warning(t("command_denied", user_id=user_id))
+                    continue
+                # Replies contain login codes: never post them to a group
+                if message.chat.type != ChatType.PRIVATE:
+                    logger.warning(t("command_not_private", user_id=user_id))
+                    continue
+                try:
+                    reply = self._handle_command(
+                        message.text, user_id, get_status, poll_now, get_routing()
+                    )
+                    if reply:
+                        await self.bot.send_message(chat_id=user_id, text=reply)
+                except TelegramError as e:
+                    logger.error(t("msg_send_error", user_id=user_id, error=e))
+                except Exception as e:
+                    # A bad command must not stop the command loop
+                    logger.error(t("command_error", user_id=user_id, error=e))
+
+    def _handle_command(
+        self,
+        text: str,
+        user_id: int,
+        get_status: Callable[[], dict[str, Any]],
+        poll_now: asyncio.Event,
+        routing: RoutingIndex,
+    ) -> str | None:
+        """Build the reply to a command (None for non-commands)."""
+        if not text.startswith("/"):
+            return None
+        command, *args = text.split()
+        command = command.split("@", 1)[0].lower()
+        lang = routing.language(user_id)
+
+        if command == "/last":
+            # Only codes this user would have been notified about
+            visible = [
+                (received, email)
+                for received, email in self.recent
+                if user_id in routing.recipients(email.mailbox, email.kind, email.sender)
+            ]
+            if not visible:
+                return t_for(lang, "cmd_last_empty")
+            try:
+                count = int(args[0]) if args else 1
+            except ValueError:
+                count = 1
+            count = min(max(1, count), len(visible))
+            return "\n\n———\n\n".join(
+                self.format_code_message(email, received, lang=lang)
+                for received, email in visible[-count:]
+            )
+
+        if command == "/status":
+            status = get_status()
+            breakers = status["breakers"]
+            return t_for(
+                lang,
+                "cmd_status",
+                last_poll=status["last_poll"] or t_for(lang, "status_never"),
+                token_expiry=status["token_expiry"],
+                outbox=status["outbox"],
+                pending_acks=status["pending_acks"],
+                recent=len(self.recent),
+                quota_used=status["quota"]["used"],
+                quota_budget=status["quota"]["budget"],
+                interval=status["quota"]["interval"],
+                gmail=breakers.get("gmail", {}).get("state", "closed"),
+                telegram=breakers.get("telegram", {}).get("state", "closed"),
+            )
+
+        if command == "/poll":
+            poll_now.set()
+            return t_for(lang, "cmd_poll")
+
+        return t_for(lang, "cmd_help")
+
+    async def run_delivery(self, outbox: Outbox) -> None:
+        """Deliver queued messages, retrying each failed recipient independently.
+
+        Runs until cancelled.
+        """
+        breaker = get_breaker(
+            "telegram",
+            failure_threshold=getattr(config, "BREAKER_FAILURE_THRESHOLD", 5),
+            reset_timeout=getattr(config, "BREAKER_RESET_TIMEOUT", 60),
         )
-        await self._broadcast(message)
+        while True:
+            changed = False
+            for entry in outbox.due(time.time()):
+                if not breaker.allow():
+                    break
+                try:
+                    with tracer.span(
+                        "telegram.send",
+                        entry.email_id,
+                        chat_id=entry.chat_id,
+                        attempt=entry.attempts + 1,
+                    ):
+                        await self.bot.send_message(chat_id=entry.chat_id, text=entry.text)
+                    breaker.record_success()
+                    outbox.delivered(entry)
+                    logger.info(t("msg_sent_to_user", user_id=entry.chat_id))
+                except TelegramError as e:
+                    if classify_error(e) is ErrorClass.PERMANENT:
+                        # Chat-specific problem (blocked bot, unknown chat): Telegram itself is fine
+                        breaker.record_success()
+                    else:
+                        breaker.record_failure()
+                    delay = retry_delay(e, entry.attempts + 1)
+                    if outbox.reschedule(entry, time.time(), delay):
+                        logger.warning(t("msg_retry", user_id=entry.chat_id, delay=delay, error=e))
+                    else:
+                        logger.error(
+                            t(
+                                "msg_dropped",
+                                user_id=entry.chat_id,
+                                attempts=entry.attempts,
+                                error=e,
+                            )
+                        )
+                changed = True
+
+            if changed:
+                try:
+                    outbox.save()
+                except OSError as e:
+                    # Worst case a restart resends delivered messages; keep delivering
+                    logger.error(t("outbox_save_error", path=outbox.path, error=e))
+            wait = outbox.next_due_in(time.time())
+            if wait is not None and breaker.retry_in() > 0:
+                wait = max(wait, breaker.retry_in())
+            await outbox.wait_for_work(wait)
+
+    async def send_token_expired_message(self, routing: RoutingIndex) -> None:
+        """Send notification that Gmail token has expired."""
+        await self._broadcast("tg_token_expired", routing.language)
 
-    async def send_startup_message(self) -> None:
+    async def send_startup_message(self, routing: RoutingIndex) -> None:
         """Send bot startup message."""
-        message = (
-            f"{t('bot_started')}\n\n"
-            f"{t('checking_email_interval', interval=config.CHECK_INTERVAL)}\n"
-            f"{t('waiting_for_emails')}"
+        await self._broadcast(
+            "tg_startup", routing.language, log_success=False, interval=config.CHECK_INTERVAL
         )
-        await self._broadcast(message, log_success=False)
@@ -0,0 +1,289 @@
+"""Opt-in hot-path instrumentation: per-stage trace spans, slow-stage log and a sampling profiler.
+
+When tracing and the slow-stage log are both disabled, `tracer.span()` returns a
+shared no-op context manager, so instrumented code pays one attribute check.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any
+
+from i18n import t
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "claude-auth-forwarder"
+
+_NOOP = nullcontext()
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def email_trace_id(msg_id: str) -> str:
+    """Trace ID derived from the Gmail message ID.
+
+    Stages that run at different times (fetch, delivery, ack) land in one trace.
+    """
+    return hashlib.sha256(msg_id.encode()).hexdigest()[:32]
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attrs")
+
+    def __init__(
+        self, name: str, trace_id: str, parent_id: str | None, attrs: dict[str, Any]
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attrs = attrs
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+        }
+
+    def to_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attrs.items()
+            ],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.slow_ms: float | None = None
+        self.json_file: str | None = None
+        self.otlp_endpoint: str | None = None
+        self._active = False
+        self._pending: list[Span] = []
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        enabled: bool = False,
+        json_file: str | None = None,
+        otlp_endpoint: str | None = None,
+        slow_ms: float | None = None,
+    ) -> None:
+        """Turn tracing and/or the slow-stage log on or off.
+
+        Args:
+            enabled: Record spans and export them
+            json_file: Append finished spans to this file as JSON lines
+            otlp_endpoint: OTLP/HTTP collector base URL, e.g. http://localhost:4318
+            slow_ms: Log a warning for any stage slower than this (even if tracing is off)
+        """
+        if otlp_endpoint and not otlp_endpoint.startswith(("http://", "https://")):
+            logger.warning(t("otlp_endpoint_invalid", endpoint=otlp_endpoint))
+            otlp_endpoint = None
+        self.enabled = enabled
+        self.json_file = json_file
+        self.otlp_endpoint = otlp_endpoint.rstrip("/") if otlp_endpoint else None
+        self.slow_ms = slow_ms
+        self._active = enabled or slow_ms is not None
+
+    def span(
+        self, name: str, msg_id: str | None = None, **attrs: Any
+    ) -> AbstractContextManager[Any]:
+        """Time a stage.
+
+        Args:
+            name: Stage name, e.g. "gmail.get"
+            msg_id: Gmail message ID; the span joins that email's trace
+                (default: the current span's trace)
+            **attrs: Span attributes
+        """
+        if not self._active:
+            return _NOOP
+        return self._span(name, msg_id, attrs)
+
+    @contextmanager
+    def _span(self, name: str, msg_id: str | None, attrs: dict[str, Any]) -> Iterator[Span]:
+        parent = _current_span.get()
+        if msg_id is not None:
+            trace_id = email_trace_id(msg_id)
+            attrs["msg_id"] = msg_id
+        else:
+            trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        parent_id = parent.span_id if parent and parent.trace_id == trace_id else None
+
+        span = Span(name, trace_id, parent_id, attrs)
+        started = time.perf_counter_ns()
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+            span.end_ns = span.start_ns + time.perf_counter_ns() - started
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        if self.slow_ms is not None and span.duration_ms > self.slow_ms:
+            logger.warning(
+                t("slow_stage", name=span.name, duration=span.duration_ms, attrs=span.attrs)
+            )
+        if self.enabled and (self.json_file or self.otlp_endpoint):
+            with self._lock:
+                self._pending.append(span)
+
+    def flush(self) -> None:
+        """Write buffered spans to TRACE_FILE and the OTLP collector.
+
+        Blocking; call from a worker thread.
+        """
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans:
+            return
+
+        if self.json_file:
+            try:
+                with open(self.json_file, "a") as f:
+                    for s in spans:
+                        f.write(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n")
+            except OSError as e:
+                logger.warning(t("trace_file_error", path=self.json_file, error=e))
+        if not self.otlp_endpoint:
+            return
+
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": SERVICE_NAME}, "spans": [s.to_otlp() for s in spans]}
+                    ],
+                }
+            ]
+        }
+        request = urllib.request.Request(
+            f"{self.otlp_endpoint}/v1/traces",
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            # Scheme is checked in configure()
+            with urllib.request.urlopen(request, timeout=5):  # nosec B310
+                pass
+        except OSError as e:
+            logger.warning(t("otlp_export_error", count=len(spans), error=e))
+
+
+tracer = Tracer()
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads and aggregates them as collapsed stacks.
+
+    The output ("frame;frame;frame count" per line) can be fed directly to
+    flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self.samples.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names: dict[int | None, str] = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack: list[str] = []
+                current: Any = frame
+                while current is not None:
+                    code = current.f_code
+                    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                    stack.append(f"{module}:{code.co_name}")
+                    current = current.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        """Write collected samples in collapsed-stack format."""
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def toggle(self, output_dir: str) -> str | None:
+        """Start profiling, or stop and dump the samples.
+
+        Returns:
+            str | None: Path of the written profile when stopping
+        """
+        if not self.running:
+            self.start()
+            logger.info(t("profiler_started"))
+            return None
+        self.stop()
+        path = os.path.join(output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        self.dump(path)
+        logger.info(t("profiler_stopped", path=path, samples=sum(self.samples.values())))
+        return path
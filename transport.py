@@ -0,0 +1,97 @@
+"""Shared HTTP transports for the Gmail and Telegram clients.
+
+Both clients keep persistent keep-alive connections, so polls and sends reuse
+already resolved and TLS-established connections instead of opening new ones.
+"""
+
+import importlib.util
+import logging
+import queue
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Literal
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from i18n import t
+
+logger = logging.getLogger(__name__)
+
+# Long polling for commands: server-side wait and client read timeout (seconds)
+GET_UPDATES_TIMEOUT = 30
+GET_UPDATES_READ_TIMEOUT = GET_UPDATES_TIMEOUT + 10
+
+
+class GmailHttpPool:
+    """Pool of persistent httplib2 connections for the Gmail API.
+
+    httplib2.Http is not thread-safe, so every request checks out its own
+    connection. Connections survive re-authentication: only the credentials
+    wrapper is replaced.
+    """
+
+    def __init__(self, size: int = 4, timeout: float = 30.0) -> None:
+        self._all = [httplib2.Http(timeout=timeout) for _ in range(max(1, size))]
+        # LIFO hands out the most recently used (still warm) connection first
+        self._idle: queue.LifoQueue[httplib2.Http] = queue.LifoQueue()
+        for http in self._all:
+            self._idle.put(http)
+        self.creds: Any = None
+
+    def bind(self, creds: Any) -> AuthorizedHttp:
+        """Use new credentials for all pooled connections.
+
+        Returns:
+            AuthorizedHttp: Transport to pass to googleapiclient `build()`
+        """
+        self.creds = creds
+        return AuthorizedHttp(creds, http=self._all[0])
+
+    @contextmanager
+    def connection(self) -> Iterator[AuthorizedHttp]:
+        """Check out an authorized connection for one request."""
+        http = self._idle.get()
+        try:
+            yield AuthorizedHttp(self.creds, http=http)
+        finally:
+            self._idle.put(http)
+
+    def close(self) -> None:
+        """Close all persistent connections."""
+        for http in self._all:
+            http.close()
+
+
+def create_telegram_bot(
+    token: str, pool_size: int = 4, timeout: float = 30.0, http2: bool = False
+) -> Bot:
+    """Create a Bot with a persistent connection pool (HTTP/2 if requested and available).
+
+    Sends and long polling (getUpdates) use separate pools, so a pending
+    long poll never holds up a send.
+    """
+    http_version: Literal["1.1", "2"] = "1.1"
+    if http2:
+        if importlib.util.find_spec("h2") is None:
+            logger.warning(t("http2_unavailable"))
+        else:
+            http_version = "2"
+
+    request = HTTPXRequest(
+        connection_pool_size=pool_size,
+        read_timeout=timeout,
+        write_timeout=timeout,
+        connect_timeout=timeout,
+        pool_timeout=timeout,
+        http_version=http_version,
+    )
+    get_updates_request = HTTPXRequest(
+        connection_pool_size=1,
+        read_timeout=GET_UPDATES_READ_TIMEOUT,
+        connect_timeout=timeout,
+        http_version=http_version,
+    )
+    return Bot(token=token, request=request, get_updates_request=get_updates_request)